@@ -19,10 +19,35 @@ from pyrddl.pvariable import PVariable
 from pyrddl.cpf import CPF
 from pyrddl.expr import Expression
 
-from typing import Dict, List, Sequence, Optional, Tuple
+from typing import AbstractSet, Dict, List, Sequence, Optional, Tuple
 
 Type = Tuple[str, str]
 
+_LE_OPS = frozenset(('<=', '<'))
+_GE_OPS = frozenset(('>=', '>'))
+
+# only comparisons, possibly under a forall, can define action bounds
+_BOUND_CANDIDATE_TAGS = frozenset(('forall',)) | _LE_OPS | _GE_OPS
+
+# tables lazily derived from pvariables and cpfs
+_CACHED_ATTRIBUTES = (
+    '_non_fluents',
+    '_state_fluents',
+    '_action_fluents',
+    '_intermediate_fluents',
+    '_observ_fluents',
+    '_intermediate_cpfs',
+    '_intermediate_cpf_by_name',
+    '_state_cpfs',
+    '_observ_cpfs',
+    '_non_fluent_ordering',
+    '_state_fluent_ordering',
+    '_action_fluent_ordering',
+    '_interm_fluent_ordering',
+    '_observ_fluent_ordering',
+    '_next_state_fluent_ordering'
+)
+
 
 class Domain(object):
     '''Domain class for accessing RDDL domain sections.
@@ -31,6 +56,11 @@ class Domain(object):
         This class is intended to be solely used by the parser and compiler.
         Do not attempt to directly use this class to build a Domain object.
 
+        The fluent tables, CPF lists and orderings are derived from
+        `pvariables` and `cpfs` on first access and cached. The returned
+        dicts and lists are shared between calls, and `pvariables` and
+        `cpfs` must not be modified after parsing.
+
     Args:
         name: Name of RDDL domain.
         requirements: List of RDDL requirements.
@@ -61,24 +91,54 @@ class Domain(object):
         self.invariants = sections.get('invariants', [])
         self.constraints = sections.get('constraints', [])
 
+        self._clear_cache()
+
+    def __getstate__(self) -> Dict:
+        '''Returns the pickled state, leaving out the cached tables.'''
+        return { key: value for key, value in self.__dict__.items() if key not in _CACHED_ATTRIBUTES }
+
+    def __setstate__(self, state: Dict) -> None:
+        '''Restores the domain from a pickled state and resets the cached tables.'''
+        self.__dict__.update(state)
+        self._clear_cache()
+
+    def _clear_cache(self):
+        '''Resets the tables derived from pvariables and cpfs.'''
+        for attr in _CACHED_ATTRIBUTES:
+            setattr(self, attr, None)
+
     def build(self):
-        self._build_preconditions_table()
+        action_fluents = self.action_fluents
+        self._build_preconditions_table(action_fluents)
         self._build_action_bound_constraints_table()
 
-    def _build_preconditions_table(self):
-        '''Builds the local action precondition expressions.'''
+    def _build_preconditions_table(self, action_fluents: Dict[str, PVariable]):
+        '''Builds the local action precondition expressions.
+
+        Args:
+            action_fluents: Mapping from name to action-fluent pvariable.
+        '''
         self.local_action_preconditions = dict()
         self.global_action_preconditions = []
-        action_fluents = self.action_fluents
+        local_preconds = self.local_action_preconditions
+        global_preconds = self.global_action_preconditions
         for precond in self.preconds:
-            scope = precond.scope
-            action_scope = [action for action in scope if action in action_fluents]
-            if len(action_scope) == 1:
-                name = action_scope[0]
-                self.local_action_preconditions[name] = self.local_action_preconditions.get(name, [])
-                self.local_action_preconditions[name].append(precond)
+            name = self._get_local_action(precond.scope, action_fluents)
+            if name is not None:
+                local_preconds.setdefault(name, []).append(precond)
             else:
-                self.global_action_preconditions.append(precond)
+                global_preconds.append(precond)
+
+    @classmethod
+    def _get_local_action(cls, scope: AbstractSet[str], action_fluents: Dict[str, PVariable]) -> Optional[str]:
+        '''Returns the single action fluent in `scope`, or None if there is not exactly one.'''
+        local_action = None
+        for name in scope:
+            if name in action_fluents:
+                if local_action is not None:
+                    return None
+                local_action = name
+        return local_action
 
     def _build_action_bound_constraints_table(self):
         '''Builds the lower and upper action bound constraint expressions.'''
@@ -88,6 +148,9 @@ class Domain(object):
         for name, preconds in self.local_action_preconditions.items():
 
             for precond in preconds:
+                if precond[0] not in _BOUND_CANDIDATE_TAGS:
+                    continue
+
                 expr_type = precond.etype
                 expr_args = precond.args
 
@@ -101,151 +164,244 @@ class Domain(object):
                     bounds_expr = precond
 
                 if bounds_expr:
-                    # lower bound
-                    bound = self._extract_lower_bound(name, bounds_expr)
-                    if bound is not None:
+                    bound, kind = self._extract_bound(name, bounds_expr)
+                    if kind == 'lower':
                         self.action_lower_bound_constraints[name] = bound
-                    else: # upper bound
-                        bound = self._extract_upper_bound(name, bounds_expr)
-                        if bound is not None:
-                            self.action_upper_bound_constraints[name] = bound
+                    elif kind == 'upper':
+                        self.action_upper_bound_constraints[name] = bound
 
 
-    def _extract_lower_bound(self, name: str, expr: Expression) -> Optional[Expression]:
-        '''Returns the lower bound expression of the action with given `name`.'''
-        etype = expr.etype
+    def _extract_bound(self, name: str, expr: Expression) -> Tuple[Optional[Expression], Optional[str]]:
+        '''Returns the bound expression of the action with given `name`
+        together with its kind ('lower' or 'upper'), or (None, None).'''
+        op = expr.etype[1]
         args = expr.args
-        if etype[1] in ['<=', '<']:
-            if args[1].is_pvariable_expression() and args[1].name == name:
-                return args[0]
-        elif etype[1] in ['>=', '>']:
-            if args[0].is_pvariable_expression() and args[0].name == name:
-                return args[1]
-        return None
-
-    def _extract_upper_bound(self, name: str, expr: Expression) -> Optional[Expression]:
-        '''Returns the upper bound expression of the action with given `name`.'''
-        etype = expr.etype
-        args = expr.args
-        if etype[1] in ['<=', '<']:
-            if args[0].is_pvariable_expression() and args[0].name == name:
-                return args[1]
-        elif etype[1] in ['>=', '>']:
-            if args[1].is_pvariable_expression() and args[1].name == name:
-                return args[0]
-        return None
+        if op in _LE_OPS:
+            smaller, greater = args[0], args[1]
+        elif op in _GE_OPS:
+            smaller, greater = args[1], args[0]
+        else:
+            return None, None
+
+        if greater.is_pvariable_expression() and greater.name == name:
+            return smaller, 'lower'
+        if smaller.is_pvariable_expression() and smaller.name == name:
+            return greater, 'upper'
+        return None, None
+
+    def _classify_pvariables(self):
+        '''Builds the non/state/action/interm/observ fluent tables in a single pass.'''
+        self._non_fluents = {}
+        self._state_fluents = {}
+        self._action_fluents = {}
+        self._intermediate_fluents = {}
+        self._observ_fluents = {}
+
+        fluents_by_type = {
+            'non-fluent': self._non_fluents,
+            'state-fluent': self._state_fluents,
+            'action-fluent': self._action_fluents,
+            'interm-fluent': self._intermediate_fluents,
+            'observ-fluent': self._observ_fluents
+        }
+
+        for pvar in self.pvariables:
+            fluents = fluents_by_type.get(pvar.fluent_type)
+            if fluents is not None:
+                fluents[str(pvar)] = pvar
 
     @property
     def non_fluents(self) -> Dict[str, PVariable]:
-        '''Returns non-fluent pvariables.'''
-        return { str(pvar): pvar for pvar in self.pvariables if pvar.is_non_fluent() }
+        '''Returns non-fluent pvariables.
+
+        Note:
+            The dict is cached and shared between calls. Do not modify it.
+        '''
+        if self._non_fluents is None:
+            self._classify_pvariables()
+        return self._non_fluents
 
     @property
     def state_fluents(self) -> Dict[str, PVariable]:
-        '''Returns state-fluent pvariables.'''
-        return { str(pvar): pvar for pvar in self.pvariables if pvar.is_state_fluent() }
+        '''Returns state-fluent pvariables.
+
+        Note:
+            The dict is cached and shared between calls. Do not modify it.
+        '''
+        if self._state_fluents is None:
+            self._classify_pvariables()
+        return self._state_fluents
 
     @property
     def action_fluents(self) -> Dict[str, PVariable]:
-        '''Returns action-fluent pvariables.'''
-        return { str(pvar): pvar for pvar in self.pvariables if pvar.is_action_fluent() }
+        '''Returns action-fluent pvariables.
+
+        Note:
+            The dict is cached and shared between calls. Do not modify it.
+        '''
+        if self._action_fluents is None:
+            self._classify_pvariables()
+        return self._action_fluents
 
     @property
     def intermediate_fluents(self) -> Dict[str, PVariable]:
-        '''Returns interm-fluent pvariables.'''
-        return { str(pvar): pvar for pvar in self.pvariables if pvar.is_intermediate_fluent() }
+        '''Returns interm-fluent pvariables.
+
+        Note:
+            The dict is cached and shared between calls. Do not modify it.
+        '''
+        if self._intermediate_fluents is None:
+            self._classify_pvariables()
+        return self._intermediate_fluents
 
     @property
     def observ_fluents(self) -> Dict[str, PVariable]:
-        '''Returns observ-fluent pvariables.'''
-        return {str(pvar): pvar for pvar in self.pvariables if pvar.is_observ_fluent()}
+        '''Returns observ-fluent pvariables.
+
+        Note:
+            The dict is cached and shared between calls. Do not modify it.
+        '''
+        if self._observ_fluents is None:
+            self._classify_pvariables()
+        return self._observ_fluents
 
     @property
     def intermediate_cpfs(self) -> List[CPF]:
-        '''Returns list of intermediate-fluent CPFs in level order.'''
-        _, cpfs = self.cpfs
-        interm_cpfs = [cpf for cpf in cpfs if cpf.name in self.intermediate_fluents]
-        interm_cpfs = sorted(interm_cpfs, key=lambda cpf: (self.intermediate_fluents[cpf.name].level, cpf.name))
-        return interm_cpfs
+        '''Returns list of intermediate-fluent CPFs in level order.
+
+        Note:
+            The list is cached and shared between calls. Do not modify it.
+        '''
+        if self._intermediate_cpfs is None:
+            _, cpfs = self.cpfs
+            interm_fluents = self.intermediate_fluents
+            interm_cpfs = [cpf for cpf in cpfs if cpf.name in interm_fluents]
+            interm_cpfs = sorted(interm_cpfs, key=lambda cpf: (interm_fluents[cpf.name].level, cpf.name))
+            self._intermediate_cpfs = interm_cpfs
+        return self._intermediate_cpfs
 
     def get_intermediate_cpf(self, name):
-        for cpf in self.intermediate_cpfs:
-            if cpf.name == name:
-                return cpf
+        if self._intermediate_cpf_by_name is None:
+            self._intermediate_cpf_by_name = { cpf.name: cpf for cpf in self.intermediate_cpfs }
+        return self._intermediate_cpf_by_name.get(name)
 
     @property
     def state_cpfs(self) -> List[CPF]:
-        '''Returns list of state-fluent CPFs.'''
-        _, cpfs = self.cpfs
-        state_cpfs = []
-        for cpf in cpfs:
-            name = utils.rename_next_state_fluent(cpf.name)
-            if name in self.state_fluents:
-                state_cpfs.append(cpf)
-        state_cpfs = sorted(state_cpfs, key=lambda cpf: cpf.name)
-        return state_cpfs
+        '''Returns list of state-fluent CPFs.
+
+        Note:
+            The list is cached and shared between calls. Do not modify it.
+        '''
+        if self._state_cpfs is None:
+            _, cpfs = self.cpfs
+            state_fluents = self.state_fluents
+            state_cpfs = []
+            for cpf in cpfs:
+                name = utils.rename_next_state_fluent(cpf.name)
+                if name in state_fluents:
+                    state_cpfs.append(cpf)
+            state_cpfs = sorted(state_cpfs, key=lambda cpf: cpf.name)
+            self._state_cpfs = state_cpfs
+        return self._state_cpfs
 
     @property
     def observ_cpfs(self) -> List[CPF]:
-        '''Returns list of observ-fluent CPFs.'''
-        _, cpfs = self.cpfs
-        observ_cpfs = [cpf for cpf in cpfs if cpf.name in self.observ_fluents]
-        observ_cpfs = sorted(observ_cpfs, key=lambda cpf: cpf.name)
-        return observ_cpfs
+        '''Returns list of observ-fluent CPFs.
+
+        Note:
+            The list is cached and shared between calls. Do not modify it.
+        '''
+        if self._observ_cpfs is None:
+            _, cpfs = self.cpfs
+            observ_fluents = self.observ_fluents
+            observ_cpfs = [cpf for cpf in cpfs if cpf.name in observ_fluents]
+            observ_cpfs = sorted(observ_cpfs, key=lambda cpf: cpf.name)
+            self._observ_cpfs = observ_cpfs
+        return self._observ_cpfs
 
     @property
     def non_fluent_ordering(self) -> List[str]:
         '''The list of non-fluent names in canonical order.
 
+        Note:
+            The list is cached and shared between calls. Do not modify it.
+
         Returns:
             List[str]: A list of fluent names.
         '''
-        return sorted(self.non_fluents)
+        if self._non_fluent_ordering is None:
+            self._non_fluent_ordering = sorted(self.non_fluents)
+        return self._non_fluent_ordering
 
     @property
     def state_fluent_ordering(self) -> List[str]:
         '''The list of state-fluent names in canonical order.
 
+        Note:
+            The list is cached and shared between calls. Do not modify it.
+
         Returns:
             List[str]: A list of fluent names.
         '''
-        return sorted(self.state_fluents)
+        if self._state_fluent_ordering is None:
+            self._state_fluent_ordering = sorted(self.state_fluents)
+        return self._state_fluent_ordering
 
     @property
     def action_fluent_ordering(self) -> List[str]:
         '''The list of action-fluent names in canonical order.
 
+        Note:
+            The list is cached and shared between calls. Do not modify it.
+
         Returns:
             List[str]: A list of fluent names.
         '''
-        return sorted(self.action_fluents)
+        if self._action_fluent_ordering is None:
+            self._action_fluent_ordering = sorted(self.action_fluents)
+        return self._action_fluent_ordering
 
     @property
     def interm_fluent_ordering(self) -> List[str]:
         '''The list of intermediate-fluent names in canonical order.
 
+        Note:
+            The list is cached and shared between calls. Do not modify it.
+
         Returns:
             List[str]: A list of fluent names.
         '''
-        interm_fluents = self.intermediate_fluents.values()
-        key = lambda pvar: (pvar.level, pvar.name)
-        return [str(pvar) for pvar in sorted(interm_fluents, key=key)]
+        if self._interm_fluent_ordering is None:
+            interm_fluents = self.intermediate_fluents.values()
+            key = lambda pvar: (pvar.level, pvar.name)
+            self._interm_fluent_ordering = [str(pvar) for pvar in sorted(interm_fluents, key=key)]
+        return self._interm_fluent_ordering
 
     @property
     def observ_fluent_ordering(self) -> List[str]:
         '''The list of observ-fluent names in canonical order.
 
+        Note:
+            The list is cached and shared between calls. Do not modify it.
+
         Returns:
             List[str]: A list of fluent names.
         '''
-        return sorted(self.observ_fluents)
+        if self._observ_fluent_ordering is None:
+            self._observ_fluent_ordering = sorted(self.observ_fluents)
+        return self._observ_fluent_ordering
 
     @property
     def next_state_fluent_ordering(self) -> List[str]:
         '''The list of next state-fluent names in canonical order.
 
+        Note:
+            The list is cached and shared between calls. Do not modify it.
+
         Returns:
             List[str]: A list of fluent names.
         '''
-        key = lambda x: x.name
-        return [cpf.name for cpf in sorted(self.state_cpfs, key=key)]
+        if self._next_state_fluent_ordering is None:
+            key = lambda x: x.name
+            self._next_state_fluent_ordering = [cpf.name for cpf in sorted(self.state_cpfs, key=key)]
+        return self._next_state_fluent_ordering
@@ -14,12 +14,92 @@
 # along with pyrddl. If not, see <http://www.gnu.org/licenses/>.
 
 
-from typing import Tuple, Sequence, Set, Union
+import collections
+import sys
+from typing import AbstractSet, Callable, Dict, FrozenSet, Tuple, Sequence, Union
 
 Value = Union[bool, int, float]
 ExprArg = Union['Expression', Tuple, str]
 
 
+_CONST_TAGS = frozenset(('number', 'boolean'))
+_LEAF_ETYPES = frozenset(('pvar', 'constant', 'penum'))
+
+# leaf expressions that never reference a fluent share the same empty scope
+_NO_SCOPE_TAGS = frozenset(('number', 'boolean', 'penum_expr', 'param_expr'))
+_EMPTY_SCOPE = frozenset()
+
+# per-kind accessors computing the type and arguments of an expression tuple
+_ExprKind = collections.namedtuple('_ExprKind', ['etype', 'args'])
+
+
+def _fixed_etype(etype: Tuple[str, str]) -> Callable[[Tuple], Tuple[str, str]]:
+    '''Returns an etype accessor for expressions fully determined by the tag.'''
+    return lambda expr: etype
+
+
+def _functor_etype(etype: str) -> Callable[[Tuple], Tuple[str, str]]:
+    '''Returns an etype accessor for expressions identified by their functor.'''
+    return lambda expr: (etype, expr[1][0])
+
+
+def _constant_etype(expr: Tuple) -> Tuple[str, str]:
+    '''Returns the etype of a number or boolean constant expression.'''
+    return ('constant', str(type(expr[1])))
+
+
+def _param_etype(expr: Tuple) -> Tuple[str, str]:
+    '''Returns the etype of a parameter expression.'''
+    return ('param', expr[1])
+
+
+def _args(expr: Tuple) -> Union[Value, Sequence[ExprArg]]:
+    '''Returns the arguments stored directly after the expression tag.'''
+    return expr[1]
+
+
+def _functor_args(expr: Tuple) -> Sequence[ExprArg]:
+    '''Returns the arguments stored after the functor of the expression.'''
+    return expr[1][1]
+
+
+_EXPR_KINDS = {
+    'number': _ExprKind(_constant_etype, _args),
+    'boolean': _ExprKind(_constant_etype, _args),
+    'pvar_expr': _ExprKind(_functor_etype('pvar'), _args),
+    'penum_expr': _ExprKind(_functor_etype('penum'), _args),
+    'param_expr': _ExprKind(_param_etype, _args),
+    'randomvar': _ExprKind(_functor_etype('randomvar'), _functor_args),
+    'func': _ExprKind(_functor_etype('func'), _functor_args),
+    'max': _ExprKind(_fixed_etype(('aggregation', 'maximum')), _args),
+    'min': _ExprKind(_fixed_etype(('aggregation', 'minimum')), _args)
+}
+
+_EXPR_KINDS.update({
+    tag: _ExprKind(_fixed_etype((etype, tag)), _args)
+    for etype, tags in [
+        ('arithmetic', ['+', '-', '*', '/']),
+        ('boolean', ['^', '&', '|', '~', '=>', '<=>']),
+        ('relational', ['>=', '<=', '<', '>', '==', '~=']),
+        ('aggregation', ['sum', 'prod', 'avg', 'forall', 'exists']),
+        ('control', ['if', 'switch'])
+    ]
+    for tag in tags
+})
+
+_UNKNOWN_KIND = _ExprKind(lambda expr: ('UNKOWN', 'UNKOWN'), lambda expr: [])
+
+# indentation prefixes indexed by nesting level, extended on demand
+_IDENTS = ['']
+
+
+def _ident(level: int) -> str:
+    '''Returns the indentation prefix for the given nesting `level`.'''
+    while len(_IDENTS) <= level:
+        _IDENTS.append(_IDENTS[-1] + '    ')
+    return _IDENTS[level]
+
+
 class Expression(object):
     '''Expression class represents a RDDL expression.
 
@@ -31,91 +111,55 @@ class Expression(object):
         expr: Expression object or nested tuple of Expressions.
     '''
 
+    __slots__ = ('_expr', '_etype', '_args', '_scope')
+
     def __init__(self, expr: Union['Expression', Tuple]) -> None:
         self._expr = expr
+        self._etype = None
+        self._args = None
+        self._scope = None
 
     def __getitem__(self, i):
         return self._expr[i]
 
+    def __getstate__(self) -> Dict[str, Tuple]:
+        '''Returns the pickled state, leaving out the cached properties.'''
+        return {'_expr': self._expr}
+
+    def __setstate__(self, state) -> None:
+        '''Restores the expression from a pickled state.
+
+        Accepts both the `__dict__` of expressions pickled before
+        `__slots__` was introduced and the default slots state.
+        '''
+        if isinstance(state, tuple):
+            _, state = state
+        self._expr = state['_expr']
+        self._etype = None
+        self._args = None
+        self._scope = None
+
     @property
     def etype(self) -> Tuple[str, str]:
         '''Returns the expression's type.'''
-        if self._expr[0] in ['number', 'boolean']:
-            return ('constant', str(type(self._expr[1])))
-        elif self._expr[0] == 'pvar_expr':
-            return ('pvar', self._expr[1][0])
-        elif self._expr[0] == 'penum_expr':
-            return ('penum', self._expr[1][0])
-        elif self._expr[0] == 'param_expr':
-            return ('param', self._expr[1])
-        elif self._expr[0] == 'randomvar':
-            return ('randomvar', self._expr[1][0])
-        elif self._expr[0] in ['+', '-', '*', '/']:
-            return ('arithmetic', self._expr[0])
-        elif self._expr[0] in ['^', '&', '|', '~', '=>', '<=>']:
-            return ('boolean', self._expr[0])
-        elif self._expr[0] in ['>=', '<=', '<', '>', '==', '~=']:
-            return ('relational', self._expr[0])
-        elif self._expr[0] == 'func':
-            return ('func', self._expr[1][0])
-        elif self._expr[0] == 'sum':
-            return ('aggregation', 'sum')
-        elif self._expr[0] == 'prod':
-            return ('aggregation', 'prod')
-        elif self._expr[0] == 'avg':
-            return ('aggregation', 'avg')
-        elif self._expr[0] == 'max':
-            return ('aggregation', 'maximum')
-        elif self._expr[0] == 'min':
-            return ('aggregation', 'minimum')
-        elif self._expr[0] == 'forall':
-            return ('aggregation', 'forall')
-        elif self._expr[0] == 'exists':
-            return ('aggregation', 'exists')
-        elif self._expr[0] == 'if':
-            return ('control', 'if')
-        elif self._expr[0] == 'switch':
-            return ('control', 'switch')
-        else:
-            return ('UNKOWN', 'UNKOWN')
+        if self._etype is None:
+            self._etype = _EXPR_KINDS.get(self._expr[0], _UNKNOWN_KIND).etype(self._expr)
+        return self._etype
 
     @property
     def args(self) -> Union[Value, Sequence[ExprArg]]:
         '''Returns the expression's arguments.'''
-        if self._expr[0] in ['number', 'boolean']:
-            return self._expr[1]
-        elif self._expr[0] == 'pvar_expr':
-            return self._expr[1]
-        elif self._expr[0] == 'penum_expr':
-            return self._expr[1]
-        elif self._expr[0] == 'param_expr':
-            return self._expr[1]
-        elif self._expr[0] == 'randomvar':
-            return self._expr[1][1]
-        elif self._expr[0] in ['+', '-', '*', '/']:
-            return self._expr[1]
-        elif self._expr[0] in ['^', '&', '|', '~', '=>', '<=>']:
-            return self._expr[1]
-        elif self._expr[0] in ['>=', '<=', '<', '>', '==', '~=']:
-            return self._expr[1]
-        elif self._expr[0] == 'func':
-            return self._expr[1][1]
-        elif self._expr[0] in ['sum', 'prod', 'avg', 'max', 'min', 'forall', 'exists']:
-            return self._expr[1]
-        elif self._expr[0] == 'if':
-            return self._expr[1]
-        elif self._expr[0] == 'switch':
-            return self._expr[1]
-        else:
-            return []
+        if self._args is None:
+            self._args = _EXPR_KINDS.get(self._expr[0], _UNKNOWN_KIND).args(self._expr)
+        return self._args
 
     def is_constant_expression(self) -> bool:
         '''Returns True if constant expression. False, othersize.'''
-        return self.etype[0] == 'constant'
+        return self._expr[0] in _CONST_TAGS
 
     def is_pvariable_expression(self) -> bool:
         '''Returns True if pvariable expression. False, otherwise.'''
-        return self.etype[0] == 'pvar'
+        return self._expr[0] == 'pvar_expr'
 
     @property
     def name(self) -> str:
@@ -127,9 +171,9 @@ class Expression(object):
         Raises:
             ValueError: If not a pvariable expression.
         '''
-        if not self.is_pvariable_expression():
+        if self._expr[0] != 'pvar_expr':
             raise ValueError('Expression is not a pvariable.')
-        return self._pvar_to_name(self.args)
+        return self._pvar_to_name(self._expr[1])
 
     @property
     def value(self):
@@ -141,47 +185,74 @@ class Expression(object):
         Raises:
             ValueError: If not a constant expression.
         '''
-        if not self.is_constant_expression():
+        if self._expr[0] not in _CONST_TAGS:
             raise ValueError('Expression is not a number.')
-        return self.args
+        return self._expr[1]
 
     def __str__(self) -> str:
         '''Returns string representing the expression.'''
-        return self.__expr_str(self, 0)
+        return ''.join(self.__expr_str(self))
 
     @classmethod
-    def __expr_str(cls, expr, level):
-        '''Returns string representing the expression.'''
-        ident = ' ' * level * 4
-
-        if isinstance(expr, str):
-            return expr
-
-        if isinstance(expr, tuple):
-            return '{}{}'.format(ident, str(expr))
-
-        if expr.etype[0] in ['pvar', 'constant', 'penum']:
-            return '{}Expression(etype={}, args={})'.format(ident, expr.etype, expr.args)
-
-        if not isinstance(expr, Expression):
-            return '{}{}'.format(ident, str(expr))
-
-        args = list(cls.__expr_str(arg, level + 1) for arg in expr.args)
-        args = '\n'.join(args)
-        return '{}Expression(etype={}, args=\n{})'.format(ident, expr.etype, args)
+    def __expr_str(cls, expr):
+        '''Yields the fragments of the string representing the expression.'''
+        stack = [(expr, 0)]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                yield item
+                continue
+
+            expr, level = item
+
+            if isinstance(expr, str):
+                yield expr
+                continue
+
+            ident = _ident(level)
+
+            if isinstance(expr, tuple):
+                yield '{}{}'.format(ident, str(expr))
+                continue
+
+            if expr.etype[0] in _LEAF_ETYPES:
+                yield '{}Expression(etype={}, args={})'.format(ident, expr.etype, expr.args)
+                continue
+
+            if not isinstance(expr, Expression):
+                yield '{}{}'.format(ident, str(expr))
+                continue
+
+            yield '{}Expression(etype={}, args=\n'.format(ident, expr.etype)
+            stack.append(')')
+            for i, arg in enumerate(reversed(expr.args)):
+                if i > 0:
+                    stack.append('\n')
+                stack.append((arg, level + 1))
 
     @property
-    def scope(self) -> Set[str]:
+    def scope(self) -> AbstractSet[str]:
         '''Returns the set of fluents in the expression's scope.
 
+        Note:
+            The scope is computed once and cached as a frozenset.
+
         Returns:
             The set of fluents in the expression's scope.
         '''
-        return self.__get_scope(self._expr)
+        if self._scope is None:
+            tag = self._expr[0]
+            if tag in _NO_SCOPE_TAGS:
+                self._scope = _EMPTY_SCOPE
+            elif tag == 'pvar_expr':
+                self._scope = frozenset((self._pvar_to_name(self._expr[1]),))
+            else:
+                self._scope = self.__get_scope(self._expr)
+        return self._scope
 
     @classmethod
     def __get_scope(cls,
-            expr: Union['Expression', Tuple]) -> Set[str]:
+            expr: Union['Expression', Tuple]) -> FrozenSet[str]:
         '''Returns the set of fluents in the expression's scope.
 
         Args:
@@ -190,27 +261,38 @@ class Expression(object):
         Returns:
             The set of fluents in the expression's scope.
         '''
-        scope = set()
-        for i, atom in enumerate(expr):
-            if isinstance(atom, Expression):
-                scope.update(cls.__get_scope(atom._expr))
-            elif type(atom) in [tuple, list]:
-                scope.update(cls.__get_scope(atom))
-            elif atom == 'pvar_expr':
-                functor, params = expr[i+1]
-                arity = len(params) if params is not None else 0
-                name = '{}/{}'.format(functor, arity)
-                scope.add(name)
-                break
-        return scope
+        # Expression is never subclassed, so exact type checks are safe
+        _Expr, _Tuple, _List = Expression, tuple, list
+
+        names = []
+        stack = [expr]
+        while stack:
+            expr = stack.pop()
+            for i, atom in enumerate(expr):
+                t = type(atom)
+                if t is _Expr:
+                    if atom._scope is not None:
+                        names.extend(atom._scope)
+                    else:
+                        stack.append(atom._expr)
+                elif t is _Tuple or t is _List:
+                    stack.append(atom)
+                elif atom == 'pvar_expr':
+                    names.append(cls._pvar_to_name(expr[i+1]))
+                    break
+        return frozenset(names)
 
     @classmethod
     def _pvar_to_name(cls, pvar_expr):
         '''Returns the name of pvariable.
 
+        Note:
+            Names are interned so that scope and fluent table lookups
+            can compare them by identity.
+
         Returns:
             Name of pvariable.
         '''
         functor = pvar_expr[0]
         arity = len(pvar_expr[1]) if pvar_expr[1] is not None else 0
-        return '{}/{}'.format(functor, arity)
+        return sys.intern('{}/{}'.format(functor, arity))
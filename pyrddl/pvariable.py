@@ -14,6 +14,7 @@
 # along with pyrddl. If not, see <http://www.gnu.org/licenses/>.
 
 
+import sys
 from typing import List, Optional, Union
 
 FluentValue = Union[bool, int, float]
@@ -88,7 +89,7 @@ class PVariable(object):
 
     def __str__(self) -> str:
         '''Returns string value of PVariable.'''
-        return '{}/{}'.format(self.name, self.arity)
+        return sys.intern('{}/{}'.format(self.name, self.arity))
 
     def __repr__(self) -> str:
         '''Returns canonical string representation of PVariable.'''
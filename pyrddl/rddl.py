@@ -286,12 +286,17 @@ class RDDL(object):
 
     def get_dependencies(self, expr):
         deps = set()
+        visited = set()
 
         expressions = [expr]
         while expressions:
             expr = expressions.pop()
 
             for name in expr.scope:
+                if name in visited:
+                    continue
+                visited.add(name)
+
                 fluent, _ = self.fluent_table[name]
 
                 if fluent.is_intermediate_fluent():
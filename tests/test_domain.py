@@ -15,10 +15,12 @@
 
 
 from pyrddl.parser import RDDLParser
+from pyrddl.domain import Domain
 from pyrddl.pvariable import PVariable
 from pyrddl.expr import Expression
 from pyrddl import utils
 
+import pickle
 import unittest
 
 
@@ -32,6 +34,9 @@ class TestDomain(unittest.TestCase):
         with open('rddl/Mars_Rover.rddl', mode='r') as file:
             MARS_ROVER = file.read()
 
+        with open('rddl/Navigation.rddl', mode='r') as file:
+            NAVIGATION = file.read()
+
         parser = RDDLParser()
         parser.build()
 
@@ -39,8 +44,28 @@ class TestDomain(unittest.TestCase):
         cls.rddl1.build()
         cls.rddl2 = parser.parse(MARS_ROVER)
         cls.rddl2.build()
+        cls.rddl3 = parser.parse(NAVIGATION)
+        cls.rddl3.build()
         cls.rddls = [cls.rddl1, cls.rddl2]
 
+    def test_pickle(self):
+        domain = self.rddl1.domain
+        self.assertIn('outflow/1', domain.action_fluents)
+        state = domain.__getstate__()
+        self.assertNotIn('_action_fluents', state)
+
+        restored = pickle.loads(pickle.dumps(domain))
+        self.assertEqual(restored.action_fluent_ordering, domain.action_fluent_ordering)
+        self.assertEqual([cpf.name for cpf in restored.state_cpfs], [cpf.name for cpf in domain.state_cpfs])
+
+    def test_setstate_without_cache(self):
+        domain = self.rddl1.domain
+        state = { key: value for key, value in domain.__dict__.items() if not key.startswith('_') }
+        restored = Domain.__new__(Domain)
+        restored.__setstate__(state)
+        self.assertEqual(sorted(restored.non_fluents), sorted(domain.non_fluents))
+        self.assertEqual(restored.interm_fluent_ordering, domain.interm_fluent_ordering)
+
     def test_non_fluents(self):
         expected_non_fluents = [
             {
@@ -150,6 +175,13 @@ class TestDomain(unittest.TestCase):
                 level2 = interm_fluents[interm_cpfs[i+1].name].level
                 self.assertLessEqual(level1, level2)
 
+    def test_get_intermediate_cpf(self):
+        rddls = [self.rddl1, self.rddl2]
+        for rddl in rddls:
+            for cpf in rddl.domain.intermediate_cpfs:
+                self.assertIs(rddl.domain.get_intermediate_cpf(cpf.name), cpf)
+            self.assertIsNone(rddl.domain.get_intermediate_cpf('undefined/0'))
+
     def test_state_cpfs(self):
         rddls = [self.rddl1, self.rddl2]
         for rddl in rddls:
@@ -165,6 +197,37 @@ class TestDomain(unittest.TestCase):
                 name = '{}/{}'.format(functor, arity)
                 self.assertIn(name, state_fluents)
 
+    def test_get_dependencies(self):
+        expected_dependencies = [
+            (self.rddl1, {
+                "rlevel'/1": {
+                    'DOWNSTREAM/2',
+                    'MAX_RES_CAP/1',
+                    'MAX_WATER_EVAP_FRAC_PER_TIME_UNIT/0',
+                    'RAIN_SCALE/1',
+                    'RAIN_SHAPE/1',
+                    'outflow/1',
+                    'rlevel/1'
+                }
+            }),
+            (self.rddl3, {
+                "location'/1": {
+                    'DECELERATION_ZONE_CENTER/2',
+                    'DECELERATION_ZONE_DECAY/1',
+                    'location/1',
+                    'move/1'
+                }
+            })
+        ]
+        for rddl, expected in expected_dependencies:
+            state_cpfs = rddl.domain.state_cpfs
+            self.assertEqual(len(state_cpfs), len(expected))
+            for cpf in state_cpfs:
+                deps = rddl.get_dependencies(cpf.expr)
+                self.assertSetEqual({ str(fluent) for fluent in deps }, expected[cpf.name])
+                for fluent in deps:
+                    self.assertFalse(fluent.is_intermediate_fluent())
+
     def test_non_fluent_ordering(self):
         rddls = [self.rddl1, self.rddl2]
         for rddl in rddls:
@@ -234,6 +297,14 @@ class TestDomain(unittest.TestCase):
         self.assertIsInstance(global_preconds, list)
         self.assertEqual(len(global_preconds), 0)
 
+    def test_get_local_action(self):
+        domain = self.rddl2.domain
+        action_fluents = domain.action_fluents
+        self.assertEqual(domain._get_local_action({'xMove/0', 'xPos/0'}, action_fluents), 'xMove/0')
+        self.assertIsNone(domain._get_local_action({'xPos/0', 'time/0'}, action_fluents))
+        self.assertIsNone(domain._get_local_action({'xMove/0', 'yMove/0', 'xPos/0'}, action_fluents))
+        self.assertIsNone(domain._get_local_action(frozenset(), action_fluents))
+
     def test_lower_bound_constraints(self):
         lower_bounds = self.rddl1.domain.action_lower_bound_constraints
         self.assertIsInstance(lower_bounds, dict)
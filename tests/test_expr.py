@@ -0,0 +1,137 @@
+# This file is part of pyrddl.
+
+# pyrddl is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# pyrddl is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with pyrddl. If not, see <http://www.gnu.org/licenses/>.
+
+
+from pyrddl.expr import Expression
+
+import pickle
+import unittest
+
+
+class TestExpression(unittest.TestCase):
+
+    def setUp(self):
+        self.x = Expression(('pvar_expr', ('x', ['?r'])))
+        self.one = Expression(('number', 1))
+        self.expr = Expression(('+', (self.x, self.one)))
+
+    def test_pickle(self):
+        self.assertEqual(self.expr.scope, {'x/1'})
+        expr = pickle.loads(pickle.dumps(self.expr))
+        self.assertIsInstance(expr, Expression)
+        self.assertEqual(expr.etype, ('arithmetic', '+'))
+        self.assertEqual(expr.scope, {'x/1'})
+        self.assertEqual(str(expr), str(self.expr))
+
+    def test_setstate_from_dict(self):
+        expr = Expression.__new__(Expression)
+        expr.__setstate__({'_expr': ('pvar_expr', ('x', ['?r']))})
+        self.assertTrue(expr.is_pvariable_expression())
+        self.assertEqual(expr.name, 'x/1')
+        self.assertEqual(expr.scope, {'x/1'})
+
+    def test_str(self):
+        cond = Expression(('if', (Expression(('boolean', True)), self.x, self.one)))
+        relational = Expression(('<=', (self.expr, cond)))
+        expr = Expression(('forall', (('typed_var', ('?r', 'res')), relational)))
+        expected = '\n'.join([
+            "Expression(etype=('aggregation', 'forall'), args=",
+            "    ('typed_var', ('?r', 'res'))",
+            "    Expression(etype=('relational', '<='), args=",
+            "        Expression(etype=('arithmetic', '+'), args=",
+            "            Expression(etype=('pvar', 'x'), args=('x', ['?r']))",
+            "            Expression(etype=('constant', \"<class 'int'>\"), args=1))",
+            "        Expression(etype=('control', 'if'), args=",
+            "            Expression(etype=('constant', \"<class 'bool'>\"), args=True)",
+            "            Expression(etype=('pvar', 'x'), args=('x', ['?r']))",
+            "            Expression(etype=('constant', \"<class 'int'>\"), args=1))))"
+        ])
+        self.assertEqual(str(expr), expected)
+
+    def test_str_leaf(self):
+        self.assertEqual(str(self.x), "Expression(etype=('pvar', 'x'), args=('x', ['?r']))")
+        self.assertEqual(str(self.one), "Expression(etype=('constant', \"<class 'int'>\"), args=1)")
+
+    def test_scope_leaves(self):
+        leaves = [
+            Expression(('number', 1.0)),
+            Expression(('boolean', False)),
+            Expression(('param_expr', '?r')),
+            Expression(('penum_expr', '@low'))
+        ]
+        for leaf in leaves:
+            self.assertEqual(leaf.scope, frozenset())
+
+    def test_scope_pvariables(self):
+        pvars = [
+            (Expression(('pvar_expr', ('x', None))), 'x/0'),
+            (Expression(('pvar_expr', ('x', ['?r']))), 'x/1'),
+            (Expression(('pvar_expr', ('x', ['?r', '?s']))), 'x/2')
+        ]
+        for pvar, name in pvars:
+            self.assertEqual(pvar.scope, {name})
+
+    def test_scope_composite(self):
+        y = Expression(('pvar_expr', ('y', None)))
+        cond = Expression(('>', (y, self.one)))
+        control = Expression(('if', (cond, self.x, self.one)))
+        self.assertEqual(control.scope, {'x/1', 'y/0'})
+
+        body = Expression(('*', (self.x, Expression(('pvar_expr', ('z', ['?r', '?s']))))))
+        aggregation = Expression(('sum', (('typed_var', ('?s', 'obj')), body)))
+        self.assertEqual(aggregation.scope, {'x/1', 'z/2'})
+
+    def test_scope_reuses_cached_child_scope(self):
+        y = Expression(('pvar_expr', ('y', None)))
+        child = Expression(('-', (self.expr, y)))
+        self.assertEqual(child.scope, {'x/1', 'y/0'})
+        self.assertIs(child.scope, child.scope)
+
+        parent = Expression(('*', (child, Expression(('pvar_expr', ('z', None))))))
+        self.assertEqual(parent.scope, {'x/1', 'y/0', 'z/0'})
+
+    def test_etype_and_args(self):
+        y = Expression(('pvar_expr', ('y', None)))
+        operands = (self.x, y)
+        expected = [
+            (('number', 1.5), ('constant', "<class 'float'>"), 1.5),
+            (('boolean', True), ('constant', "<class 'bool'>"), True),
+            (('pvar_expr', ('x', ['?r'])), ('pvar', 'x'), ('x', ['?r'])),
+            (('penum_expr', '@low'), ('penum', '@'), '@low'),
+            (('param_expr', '?r'), ('param', '?r'), '?r'),
+            (('randomvar', ('Normal', operands)), ('randomvar', 'Normal'), operands),
+            (('func', ('exp', operands)), ('func', 'exp'), operands),
+            (('sum', operands), ('aggregation', 'sum'), operands),
+            (('prod', operands), ('aggregation', 'prod'), operands),
+            (('avg', operands), ('aggregation', 'avg'), operands),
+            (('max', operands), ('aggregation', 'maximum'), operands),
+            (('min', operands), ('aggregation', 'minimum'), operands),
+            (('forall', operands), ('aggregation', 'forall'), operands),
+            (('exists', operands), ('aggregation', 'exists'), operands),
+            (('if', operands), ('control', 'if'), operands),
+            (('switch', operands), ('control', 'switch'), operands),
+            (('undefined', operands), ('UNKOWN', 'UNKOWN'), [])
+        ]
+        for op in ['+', '-', '*', '/']:
+            expected.append(((op, operands), ('arithmetic', op), operands))
+        for op in ['^', '&', '|', '~', '=>', '<=>']:
+            expected.append(((op, operands), ('boolean', op), operands))
+        for op in ['>=', '<=', '<', '>', '==', '~=']:
+            expected.append(((op, operands), ('relational', op), operands))
+
+        for expr, etype, args in expected:
+            expr = Expression(expr)
+            self.assertEqual(expr.etype, etype)
+            self.assertEqual(expr.args, args)